@@ -1,7 +1,10 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pydeck as pdk
 import streamlit as st
+from colormaps import interpolate_colormap, pack_rgba, packed_rgba_accessor
+from geometry import drop_missing_geometries
 
 # Handles all Aggregated Census Tract display
 
@@ -134,20 +137,6 @@ def _resolve_metric_column(gdf: gpd.GeoDataFrame, columns: list[str]) -> str | N
 	return None
 
 
-def _interpolate_color(stops: list[list[int]], t: float) -> list[int]:
-	t = min(max(t, 0.0), 1.0)
-	if len(stops) == 1:
-		return stops[0]
-	segment = t * (len(stops) - 1)
-	idx = int(segment)
-	frac = segment - idx
-	if idx >= len(stops) - 1:
-		return stops[-1]
-	start = stops[idx]
-	end = stops[idx + 1]
-	return [int(start[i] + (end[i] - start[i]) * frac) for i in range(4)]
-
-
 def _rgba_to_hex(color: list[int]) -> str:
 	r, g, b, _a = color
 	return f"#{r:02x}{g:02x}{b:02x}"
@@ -157,8 +146,7 @@ def prepare_aggregation_polygons(
     gdf: gpd.GeoDataFrame,
     metric_key: str,
 ) -> gpd.GeoDataFrame:
-    gdf = gdf[gdf.geometry.notnull()]
-    gdf = gdf[~gdf.geometry.is_empty]
+    gdf = drop_missing_geometries(gdf)
     if gdf.empty:
         return gdf
 	
@@ -175,20 +163,20 @@ def prepare_aggregation_polygons(
         restriction_colors = RESTRICTION_COLORS
         if metric_col and metric_col in gdf.columns:
             gdf = gdf.copy()
-            mapped_colors = gdf[metric_col].map(restriction_colors)
-            gdf["fill_color"] = mapped_colors.apply(
-				lambda x: x if isinstance(x, list) else [150, 150, 150, 140]
-			)
-            gdf["tooltip_html"] = gdf[metric_col].apply(lambda v: f"<b>{metric_key}</b>: {v}")
+            gdf["fill_color"] = pack_rgba(np.array(
+                [restriction_colors.get(v, [150, 150, 150, 140]) for v in gdf[metric_col].tolist()],
+                dtype=np.uint8,
+            ))
+            gdf["tooltip_html"] = f"<b>{metric_key}</b>: " + gdf[metric_col].astype(str)
         else:
             gdf = gdf.assign(
-                fill_color=[150, 150, 150, 140],
+                fill_color=pack_rgba(np.array([[150, 150, 150, 140]], dtype=np.uint8))[0],
                 tooltip_html=f"<b>{metric_key}</b>: N/A"
             )
         return gdf
 
     if metric_col is None:
-        gdf = gdf.assign(metric_val=0, metric_norm=0, fill_color=[200, 200, 200, 140])
+        gdf = gdf.assign(metric_val=0, metric_norm=0, fill_color=pack_rgba(np.array([[200, 200, 200, 140]], dtype=np.uint8))[0])
         gdf = gdf.assign(tooltip_html=f"<b>{metric_key}</b>: N/A")
         return gdf
 
@@ -211,20 +199,18 @@ def prepare_aggregation_polygons(
 
     label = metric.get("label", metric_key)
     value_format = metric.get("format", "{value:,.2f}")
-    tooltip = values.apply(lambda v: f"<b>{label}</b>: " + value_format.format(value=v))
+    tooltip = [f"<b>{label}</b>: " + value_format.format(value=v) for v in values.tolist()]
 
     gdf = gdf.assign(
         metric_val=values,
         metric_norm=norm,
-        fill_color=norm.apply(lambda n: _interpolate_color(color_stops, float(n))),
+        fill_color=pack_rgba(interpolate_colormap(color_stops, norm.to_numpy())),
         tooltip_html=tooltip,
     )
     return gdf
 
 
-def build_aggregation_layer(gdf: gpd.GeoDataFrame, metric_key: str) -> pdk.Layer:
-	
-	polygons = prepare_aggregation_polygons(gdf, metric_key)
+def build_aggregation_layer(polygons: dict) -> pdk.Layer:
 	return pdk.Layer(
 		"GeoJsonLayer",
 		data=polygons,
@@ -233,7 +219,7 @@ def build_aggregation_layer(gdf: gpd.GeoDataFrame, metric_key: str) -> pdk.Layer
 		highlight_color=[255, 255, 0, 200],
 		stroked=True,
 		filled=True,
-		get_fill_color="fill_color",
+		get_fill_color=packed_rgba_accessor("properties.fill_color"),
 		get_line_color=[0, 0, 0, 230],  # <-- Black border
         line_width_min_pixels=0.75,        # <-- Thin line
 		opacity=0.9,
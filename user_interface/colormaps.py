@@ -0,0 +1,65 @@
+import numpy as np
+
+# Color ramps shared by the layer modules. Each fills an (N, 4) uint8 RGBA buffer in place,
+# evaluating each branch only on the rows it applies to.
+
+def aadt_colormap(norm: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    # Green -> yellow -> red over the normalized AADT range
+    if out is None:
+        out = np.empty((len(norm), 4), dtype=np.uint8)
+    lo = norm <= 0.5
+    hi = ~lo
+    out[lo, 0] = 255 * (norm[lo] / 0.5)
+    out[hi, 0] = 255
+    out[lo, 1] = 255
+    out[hi, 1] = 255 - 255 * ((norm[hi] - 0.5) / 0.5)
+    out[:, 2] = 0
+    out[:, 3] = 255
+    return out
+
+
+def aadt_lut_colormap(norm: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    # Nearest-entry lookup into a ramp sampled at len(lut) evenly spaced points over [0, 1]
+    idx = np.rint(np.clip(norm, 0.0, 1.0) * (len(lut) - 1)).astype(np.intp)
+    return lut[idx]
+
+
+def interpolate_colormap(stops: list[list[int]], t: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    # Piecewise-linear ramp through evenly spaced color stops, t clipped to [0, 1]
+    if out is None:
+        out = np.empty((len(t), 4), dtype=np.uint8)
+    stops_arr = np.asarray(stops, dtype=np.float64)
+    if len(stops) == 1:
+        out[:] = stops_arr[0]
+        return out
+    segment = np.clip(t, 0.0, 1.0) * (len(stops) - 1)
+    idx = segment.astype(int)
+    at_end = idx >= len(stops) - 1
+    idx[at_end] = len(stops) - 2
+    frac = segment - idx
+    start = stops_arr[idx]
+    out[:] = start + (stops_arr[idx + 1] - start) * frac[:, None]
+    out[at_end] = stops_arr[-1]
+    return out
+
+
+def pack_rgba(colors: np.ndarray) -> np.ndarray:
+    # (N, 4) uint8 RGBA -> (N,) uint32 view over the same bytes, so a color column stays contiguous.
+    # The little-endian view makes the value r | g << 8 | b << 16 | a << 24 on any host.
+    return np.ascontiguousarray(colors, dtype=np.uint8).view("<u4").reshape(-1)
+
+
+def unpack_rgba(packed: np.ndarray) -> np.ndarray:
+    # Inverse of pack_rgba
+    return np.ascontiguousarray(packed, dtype="<u4").view(np.uint8).reshape(-1, 4)
+
+
+# The AADT ramp sampled once at import: 256 packed RGBA entries (1 KiB), so coloring a layer is a
+# single take. Rounding the normalized AADT to the nearest 1/255 shifts a channel by at most one level.
+AADT_LUT = pack_rgba(aadt_colormap(np.linspace(0.0, 1.0, 256)))
+
+
+def packed_rgba_accessor(field: str) -> str:
+    # deck.gl accessor expression that unpacks a pack_rgba value in the browser,
+    # so the payload carries one int per row instead of a 4-element list
+    return f"[{field} & 255, ({field} >> 8) & 255, ({field} >> 16) & 255, {field} >>> 24]"
@@ -0,0 +1,11 @@
+import geopandas as gpd
+import shapely
+
+# Geometry helpers shared by the loader and the layer modules
+
+def drop_missing_geometries(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    # One vectorized pass over the geometry array instead of chained notnull() / is_empty filters.
+    # Frames coming out of load_geojson are already clean, so skip the filtered copy when nothing is dropped.
+    geoms = gdf.geometry.to_numpy()
+    keep = shapely.is_geometry(geoms) & ~shapely.is_empty(geoms)
+    return gdf if keep.all() else gdf[keep]
@@ -1,8 +1,7 @@
 import streamlit as st
 import pydeck as pdk
-from pathlib import Path
 from aggregation import render_aggregation_legend
-from utils import load_geojson, DATASETS, build_layers, map_sidebar, get_default_view, dataset_details
+from utils import load_datasets, DATASETS, build_layers, map_sidebar, get_default_view, dataset_details
 
 # Census Aggregated Page, where we show data aggregated at the census tract level, allowing users to explore broader spatial patterns and relationships across the city.
 DEFAULT_PAGE = "Population"
@@ -12,6 +11,7 @@ st.set_page_config(page_title="Layering the Curb: Spatial Insights gathered DC T
 st.sidebar.header("Map Layers")
 
 selected_layers = map_sidebar("aggregation", default=DEFAULT_PAGE)
+loaded = load_datasets(["Census Tracts"])
 
 st.title("Transportation & Traffic Map (Aggregated Dataset View)")
 
@@ -75,8 +75,7 @@ with col_legend:
             unsafe_allow_html=True,
         )
 
-    census_gdf = load_geojson(DATASETS["Census Tracts"]["path"])
     metric_key = selected_layers[0] if selected_layers else DEFAULT_PAGE
-    render_aggregation_legend(census_gdf, metric_key)
+    render_aggregation_legend(loaded["Census Tracts"], metric_key)
 
-dataset_details("aggregation", DATASETS, selected_layers=None, selected_row=None)
\ No newline at end of file
+dataset_details("aggregation", DATASETS, selected_layers=None, loaded=loaded, selected_row=None)
\ No newline at end of file
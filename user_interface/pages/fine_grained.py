@@ -1,13 +1,11 @@
 # A streamlit app to visualize parking and traffic data on maps
 import streamlit as st
-import geopandas as gpd
-import pandas as pd
 import contextlib
 import warnings
 import pydeck as pdk
-from publictransport import prepare_public_transportation_points, render_public_transport_legend
+from publictransport import render_public_transport_legend
 from trafficvolume import render_traffic_legend
-from utils import load_geojson, DATASETS, build_layers, map_sidebar, get_default_view, dataset_details
+from utils import load_datasets, prepared_transit_points, prepared_traffic_lines, transit_label_lookup, DATASETS, build_layers, map_sidebar, get_default_view, dataset_details
 
 @contextlib.contextmanager
 def suppress_warnings():
@@ -22,6 +20,7 @@ DEFAULT_PAGE = "Public Transportation"
 
 st.sidebar.header("Map Layers")
 selected_layers = map_sidebar("single", default=DEFAULT_PAGE)
+loaded = load_datasets(selected_layers)
 
 st.title(f"Transportation & Traffic Map (Single Dataset View)")
 
@@ -32,15 +31,13 @@ highlight_layer = None
 
 # Search Engine for Public Transportation layer
 if "Public Transportation" in selected_layers:
-    transit_points = prepare_public_transportation_points(
-        load_geojson(DATASETS["Public Transportation"]["path"])
-    )
+    transit_points = prepared_transit_points(DATASETS["Public Transportation"]["path"])
     if not transit_points.empty:
         st.subheader("Search Metro Stations and Bus Stops")
         if "reset_tick" not in st.session_state:
             st.session_state["reset_tick"] = 0
         reset_clicked = st.button("Reset map", type="secondary")
-        options = transit_points["label"].astype(str).tolist()
+        options, transit_lookup = transit_label_lookup(DATASETS["Public Transportation"]["path"])
         selection = st.selectbox(
             "Select a stop or station",
             options,
@@ -51,8 +48,8 @@ if "Public Transportation" in selected_layers:
         if reset_clicked:
             st.session_state["reset_tick"] += 1
             st.rerun()
-        if selection:
-            selected_row = transit_points[transit_points["label"].astype(str) == selection].head(1)
+        if selection and selection in transit_lookup.index:
+            selected_row = transit_lookup.loc[[selection]]
             if not selected_row.empty:
                 highlight_layer = pdk.Layer(
                     "ScatterplotLayer",
@@ -115,10 +112,9 @@ with col_legend:
         )
 
     if "Traffic Volume" in selected_layers:
-        traffic_gdf = load_geojson(DATASETS["Traffic Volume"]["path"])
-        render_traffic_legend(traffic_gdf)
+        render_traffic_legend(prepared_traffic_lines(DATASETS["Traffic Volume"]["path"]))
 
     if "Public Transportation" in selected_layers:
         render_public_transport_legend()
 
-dataset_details("single", DATASETS, selected_layers, selected_row=selected_row)
\ No newline at end of file
+dataset_details("single", DATASETS, selected_layers, loaded, selected_row=selected_row)
\ No newline at end of file
@@ -1,13 +1,33 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pydeck as pdk
+import shapely
 import streamlit as st
-import pydeck as pdk
+from colormaps import pack_rgba, packed_rgba_accessor
+from geometry import drop_missing_geometries
 
 # Handles all Public Transportation display
-def prepare_public_transportation_points(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
-    gdf = gdf[gdf.geometry.notnull()]
-    gdf = gdf[~gdf.geometry.is_empty]
+TRANSIT_DERIVED_COLUMNS = {"lon", "lat", "mode", "lines_count", "label", "lines", "radius", "color", "tooltip_html"}
+# Fields the ScatterplotLayer and tooltip read; the rest stay server-side for search and details
+TRANSIT_LAYER_COLUMNS = ["lon", "lat", "radius", "color", "tooltip_html"]
+
+# RGBA per mode; any mode not in TRANSIT_MODE_INDEX uses the last (grey) row
+TRANSIT_PALETTE = np.array(
+    [
+        [0, 102, 204, 210],   # Metro Station
+        [255, 140, 0, 200],   # Bus Stop
+        [120, 120, 120, 180], # Other
+    ],
+    dtype=np.uint8,
+)
+TRANSIT_MODE_INDEX = {"METRO STATION": 0, "BUS STOP": 1}
+
+def prepare_public_transportation_points(gdf: gpd.GeoDataFrame) -> pd.DataFrame:
+    # Already prepared (e.g. a cached frame passed back in)
+    if TRANSIT_DERIVED_COLUMNS.issubset(gdf.columns):
+        return gdf
+    gdf = drop_missing_geometries(gdf)
     if gdf.empty:
         return gdf
     
@@ -17,49 +37,58 @@ def prepare_public_transportation_points(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFr
     lines_type_col = "LINE" if "LINE" in gdf.columns else None
 
 
-    if "lon" not in gdf.columns or "lat" not in gdf.columns:
-        if gdf.geom_type.isin(["MultiPoint"]).any():
+    if "lon" in gdf.columns and "lat" in gdf.columns:
+        lon, lat = gdf["lon"], gdf["lat"]
+    else:
+        # Integer type ids instead of geom_type strings; both steps are skipped for all-Point data
+        type_ids = shapely.get_type_id(gdf.geometry.to_numpy())
+        if (type_ids == shapely.GeometryType.MULTIPOINT).any():
             gdf = gdf.explode(index_parts=False)
-        gdf = gdf[gdf.geom_type.isin(["Point"])]
-        gdf = gdf.assign(lon=gdf.geometry.x, lat=gdf.geometry.y)
+            type_ids = shapely.get_type_id(gdf.geometry.to_numpy())
+        is_point = type_ids == shapely.GeometryType.POINT
+        if not is_point.all():
+            gdf = gdf[is_point]
+        coords = shapely.get_coordinates(gdf.geometry.to_numpy())
+        lon, lat = coords[:, 0], coords[:, 1]
+
+    # The layer positions points from lon/lat, so the geometry column is dropped before any columns are added
+    df = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+
+    # Columns are built as standalone Series first, so the frame is copied by a single assign
+    mode = df[type_col].astype(str).astype("category") if type_col else pd.Series("Other", index=df.index, dtype="category")
+    lines_count = df[lines_col].fillna(1).astype(int) if lines_col else pd.Series(1, index=df.index)
+    label = df[name_col].fillna("Unknown") if name_col else pd.Series("Unknown", index=df.index)
+    lines = df[lines_type_col].fillna("Unknown") if lines_type_col else pd.Series("Unknown", index=df.index)
+
+    # Resolve the palette row once per distinct mode, then broadcast through the category codes
+    category_idx = mode.cat.categories.map(TRANSIT_MODE_INDEX).fillna(len(TRANSIT_PALETTE) - 1).astype(np.int8).to_numpy()
+    mode_idx = category_idx[mode.cat.codes.to_numpy()]
+    is_metro = mode_idx == 0
 
+    radius = np.where(is_metro, 60 + np.minimum(lines_count.to_numpy(), 6) * 12, 10)
 
-    gdf = gdf.assign(
-        mode=gdf[type_col].astype(str) if type_col else "Other",
-        lines_count=gdf[lines_col].fillna(1).astype(int) if lines_col else 1,
-        label=gdf[name_col].fillna("Unknown") if name_col else "Unknown",
-        lines=gdf[lines_type_col].fillna("Unknown") if lines_type_col else "Unknown",
+    short_html = "<b>" + label.astype(str) + "</b><br/>Type: " + mode.astype(str)
+    metro_html = (
+        short_html
+        + "<br/>Num of Lines: " + lines_count.astype(str)
+        + "<br/>Lines: " + lines.astype(str)
     )
 
-    gdf = gdf.assign(
-        radius=gdf.apply(
-            lambda row: 60 + min(row["lines_count"], 6) * 12
-            if row["mode"] == "METRO STATION"
-            else 10,
-            axis=1,
-        ),
-        color=gdf.apply(
-            lambda row: [0, 102, 204, 210]
-            if row["mode"] == "METRO STATION"
-            else [255, 140, 0, 200]
-            if row["mode"] == "BUS STOP"
-            else [120, 120, 120, 180],
-            axis=1,
-        ),
-        tooltip_html=gdf.apply(
-            lambda row: (
-                f"<b>{row['label']}</b><br/>Type: {row['mode']}<br/>Num of Lines: {row['lines_count']}<br/>Lines: {row['lines']}"
-                if row["mode"] == "METRO STATION"
-                else f"<b>{row['label']}</b><br/>Type: {row['mode']}"
-            ),
-            axis=1,
-        ),
+    df = df.assign(
+        lon=lon,
+        lat=lat,
+        mode=mode,
+        lines_count=lines_count,
+        label=label,
+        lines=lines,
+        radius=radius,
+        color=pack_rgba(TRANSIT_PALETTE[mode_idx]),
+        tooltip_html=np.where(is_metro, metro_html, short_html),
     )
-    return gdf
+    return df
 
 
-def build_public_transport_layer(gdf: gpd.GeoDataFrame) -> pdk.Layer:
-    points = prepare_public_transportation_points(gdf)
+def build_public_transport_layer(points: list[dict]) -> pdk.Layer:
     return pdk.Layer(
         "ScatterplotLayer",
         data=points,
@@ -67,7 +96,7 @@ def build_public_transport_layer(gdf: gpd.GeoDataFrame) -> pdk.Layer:
         get_radius="radius",
         radius_min_pixels=1,
         radius_max_pixels=30,
-        get_fill_color="color",
+        get_fill_color=packed_rgba_accessor("color"),
         pickable=True,
         auto_highlight=True,
         opacity=0.9,
@@ -1,75 +1,66 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pydeck as pdk
 import streamlit as st
+from colormaps import AADT_LUT, aadt_lut_colormap, packed_rgba_accessor
+from geometry import drop_missing_geometries
 
 # Handles all Traffic Volume display
+TRAFFIC_DERIVED_COLUMNS = {"line_width", "line_color", "tooltip_html"}
+# Fields the PathLayer and tooltip read; everything else stays out of the browser payload
+TRAFFIC_LAYER_COLUMNS = ["line_width", "line_color", "tooltip_html"]
+
 def prepare_traffic_lines(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
-    gdf = gdf[gdf.geometry.notnull()]
-    gdf = gdf[~gdf.geometry.is_empty]
+    # Already prepared (e.g. a cached frame passed back in)
+    if TRAFFIC_DERIVED_COLUMNS.issubset(gdf.columns):
+        return gdf
+    gdf = drop_missing_geometries(gdf)
     if gdf.empty:
         return gdf
 
     aadt_col = "AADT" if "AADT" in gdf.columns else "aadt" if "aadt" in gdf.columns else None
     if not aadt_col:
-        gdf = gdf.assign(aadt_val=0)
+        aadt_val = np.zeros(len(gdf))
+    elif gdf[aadt_col].dtype.kind in "iuf":
+        # Numeric columns (the usual case) skip pd.to_numeric's per-element parsing
+        aadt_val = gdf[aadt_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        aadt_val = np.where(np.isnan(aadt_val), 0.0, aadt_val)
     else:
-        gdf = gdf.assign(aadt_val=pd.to_numeric(gdf[aadt_col], errors="coerce").fillna(0))
-
-    min_aadt = float(gdf["aadt_val"].min()) if not gdf.empty else 0
-    max_aadt = float(gdf["aadt_val"].max()) if not gdf.empty else 0
-    denom = (max_aadt - min_aadt) if max_aadt != min_aadt else 1.0
-    gdf = gdf.assign(aadt_norm=(gdf["aadt_val"] - min_aadt) / denom)
+        aadt_val = pd.to_numeric(gdf[aadt_col], errors="coerce").fillna(0).to_numpy()
 
-    def aadt_color(n: float) -> list[int]:
-        if n <= 0.5:
-            ratio = n / 0.5
-            r = int(0 + 255 * ratio)
-            g = 255
-            b = 0
-        else:
-            ratio = (n - 0.5) / 0.5
-            r = 255
-            g = int(255 - 255 * ratio)
-            b = 0
-        return [r, g, b, 255]
+    min_aadt = float(aadt_val.min())
+    span = float(np.ptp(aadt_val))
+    norm = (aadt_val - min_aadt) / (span if span else 1.0)
 
     gdf = gdf.assign(
-        line_width=(gdf["aadt_norm"].pow(0.5) * 14 + 1.5).round(2),
-        line_color=gdf["aadt_norm"].apply(aadt_color),
-        tooltip_html=gdf["aadt_val"].apply(lambda v: f"<b>AADT:</b> {int(v):,}"),
+        line_width=np.round(np.sqrt(norm) * 14 + 1.5, 2),
+        line_color=aadt_lut_colormap(norm, AADT_LUT),
+        tooltip_html=[f"<b>AADT:</b> {v:,}" for v in aadt_val.astype(int).tolist()],
     )
+    # Kept with the frame so the legend shows the range the colors were scaled over
+    gdf.attrs["aadt_range"] = (int(min_aadt), int(min_aadt + span))
     return gdf
 
 
-def build_traffic_layer(gdf: gpd.GeoDataFrame) -> pdk.Layer:
-    traffic = prepare_traffic_lines(gdf)
+def build_traffic_layer(traffic: list[dict]) -> pdk.Layer:
     return pdk.Layer(
-        "GeoJsonLayer",
+        "PathLayer",
         data=traffic,
         pickable=True,
         auto_highlight=True,
         highlight_color=[255, 255, 0, 255],
         opacity=0.9,
-        stroked=True,
-        filled=False,
-        get_line_color="line_color",
-        get_line_width="line_width",
-        line_width_min_pixels=1,
-        line_width_max_pixels=20,
+        get_path="path",
+        get_color=packed_rgba_accessor("line_color"),
+        get_width="line_width",
+        width_min_pixels=1,
+        width_max_pixels=20,
     )
 
 def render_traffic_legend(gdf: gpd.GeoDataFrame) -> None:
-    aadt_col = "AADT" if "AADT" in gdf.columns else "aadt" if "aadt" in gdf.columns else None
-    if aadt_col:
-        aadt_vals = pd.to_numeric(gdf[aadt_col], errors="coerce").dropna()
-        if not aadt_vals.empty:
-            min_aadt = int(aadt_vals.min())
-            max_aadt = int(aadt_vals.max())
-        else:
-            min_aadt, max_aadt = 0, 0
-    else:
-        min_aadt, max_aadt = 0, 0
+    # Expects the output of prepare_traffic_lines
+    min_aadt, max_aadt = gdf.attrs.get("aadt_range", (0, 0))
 
     st.subheader("Traffic Volume (AADT)")
     st.markdown(
@@ -1,12 +1,16 @@
 import streamlit as st
 
+import json
 import geopandas as gpd
+import numpy as np
+import pandas as pd
 from pathlib import Path
 import pydeck as pdk
-from shapely.geometry import box
-from publictransport import build_public_transport_layer
-from trafficvolume import build_traffic_layer
-from aggregation import build_aggregation_layer, AGGREGATION_METRICS
+import shapely
+from publictransport import build_public_transport_layer, prepare_public_transportation_points, TRANSIT_LAYER_COLUMNS
+from trafficvolume import build_traffic_layer, prepare_traffic_lines, TRAFFIC_LAYER_COLUMNS
+from aggregation import build_aggregation_layer, prepare_aggregation_polygons, AGGREGATION_METRICS
+from geometry import drop_missing_geometries
 
 #Basics Functions used across the app, such as loading geojson files, building layers, and getting default view settings.
 
@@ -17,35 +21,42 @@ DATASETS = {
         "path": BASE_DIR / "cleaned_data" / "traffic_data.geojson",
         "color": [255, 99, 71, 140],
         "line_color": [255, 99, 71],
-        "tooltip": "Traffic: {AADT}"
+        "tooltip": "Traffic: {AADT}",
+        "keep_columns": ["AADT"],
     },
     "Public Transportation": {
         "path": BASE_DIR / "cleaned_data" / "public_transportation.geojson",
         "color": [138, 43, 226, 140],
         "line_color": [138, 43, 226],
-        "tooltip": "Transit: {NAME}"
+        "tooltip": "Transit: {NAME}",
+        "keep_columns": ["NAME", "TYPE", "NUM_LINES", "LINE"],
     },
     "Neighborhood Labels": {
         "path": BASE_DIR / "cleaned_data" / "neighborhood_labels.geojson",
         "color": [255, 215, 0, 120],
         "line_color": [255, 215, 0],
-        "tooltip": "Neighborhood: {NAME}"
+        "tooltip": "Neighborhood: {NAME}",
+        "keep_columns": ["NAME"],
     },
     "Census Tracts": {
         "path": BASE_DIR / "cleaned_data" / "census_tracts_with_labels.geojson",
         "color": [112, 128, 144, 80],
         "line_color": [112, 128, 144],
-        "tooltip": "Tract: {GEOID}"
+        "tooltip": "Tract: {GEOID}",
+        "keep_columns": ["TRACT", "GEOID", *(col for metric in AGGREGATION_METRICS.values() for col in metric["columns"])],
     },
     
 }
 
 AGGREGATION_DATASETS = ["Population", "Population Density", "Bus Stop Count", "Metro Station Count", "Average Road Intensity", "Vehicle Miles Traveled", "Maximum Total Parking Count", "Average Unrestricted Hours of Parking a Week", "Most Common Parking Restriction"]
 
-def load_geojson(path: Path) -> gpd.GeoDataFrame:
-    gdf = gpd.read_file(path)
-    gdf = gdf[gdf.geometry.notnull()]
-    gdf = gdf[~gdf.geometry.is_empty]
+@st.cache_data(show_spinner=False)
+def load_geojson(path: Path, keep: list[str] | None = None) -> gpd.GeoDataFrame:
+    try:
+        gdf = gpd.read_file(path, engine="pyogrio", use_arrow=True)
+    except ImportError:
+        gdf = gpd.read_file(path)
+    gdf = drop_missing_geometries(gdf)
 
     if gdf.crs is None:
         minx, miny, maxx, maxy = gdf.total_bounds
@@ -64,8 +75,101 @@ def load_geojson(path: Path) -> gpd.GeoDataFrame:
             else:
                 gdf = gdf.set_crs(epsg=26918, allow_override=True)
 
+    # Project to the attributes used downstream (matched case-insensitively, like the layer modules do)
+    if keep is not None:
+        keep_lower = {col.lower() for col in keep}
+        gdf = gdf[[col for col in gdf.columns if col.lower() in keep_lower] + [gdf.geometry.name]]
+
+    # Most cleaned datasets are already WGS84; skip the identity reprojection and its geometry copy
+    if gdf.crs.to_epsg() == 4326:
+        return gdf
     return gdf.to_crs(epsg=4326)
 
+# Raw datasets for one rerun, loaded once and shared by the view, legend and details helpers
+def load_datasets(names: list[str]) -> dict[str, gpd.GeoDataFrame]:
+    return {
+        name: load_geojson(DATASETS[name]["path"], DATASETS[name]["keep_columns"])
+        for name in names
+        if DATASETS[name]["path"].exists()
+    }
+
+# Bounds are tiny and static per dataset, so repeated renders skip the total_bounds scan
+@st.cache_data(show_spinner=False)
+def dataset_bounds(name: str) -> tuple[float, float, float, float] | None:
+    dataset = DATASETS[name]
+    if not dataset["path"].exists():
+        return None
+    gdf = load_geojson(dataset["path"], dataset["keep_columns"])
+    if gdf.empty:
+        return None
+    return tuple(float(v) for v in gdf.total_bounds)
+
+# Attribute table for the "Show dataset preview" expanders, built once per dataset and shared read-only
+@st.cache_resource(show_spinner=False)
+def dataset_preview(name: str) -> pd.DataFrame:
+    dataset = DATASETS[name]
+    gdf = load_geojson(dataset["path"], dataset["keep_columns"])
+    return pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+
+# Prepared (styled) layer data, cached so reruns only rebuild the pydeck layers
+@st.cache_data(show_spinner=False, max_entries=8)
+def prepared_transit_points(path: Path) -> pd.DataFrame:
+    return prepare_public_transportation_points(load_geojson(path, DATASETS["Public Transportation"]["keep_columns"]))
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def prepared_traffic_lines(path: Path) -> gpd.GeoDataFrame:
+    return prepare_traffic_lines(load_geojson(path, DATASETS["Traffic Volume"]["keep_columns"]))
+
+# Search options for the transit selectbox, plus the points indexed by label (first row wins) for hash lookups
+@st.cache_data(show_spinner=False, max_entries=8)
+def transit_label_lookup(path: Path) -> tuple[list[str], pd.DataFrame]:
+    points = prepared_transit_points(path)
+    points = points.assign(label=points["label"].astype(str))
+    lookup = points.drop_duplicates("label").set_index("label", drop=False)
+    return points["label"].tolist(), lookup
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def prepared_aggregation_polygons(path: Path, metric_key: str) -> gpd.GeoDataFrame:
+    return prepare_aggregation_polygons(load_geojson(path, DATASETS["Census Tracts"]["keep_columns"]), metric_key)
+
+# Display-only simplification tolerances, in degrees (1e-5 is ~1 m and 5e-5 is ~5 m at DC's latitude).
+# Invisible at the app's zoom levels, but they cut the vertices sent to the browser by roughly 4x.
+TRAFFIC_SIMPLIFY_TOLERANCE = 1e-5
+TRACT_SIMPLIFY_TOLERANCE = 5e-5
+
+# Records for the transit ScatterplotLayer, projected to the fields it reads (positions come from lon/lat, so no geometry).
+# pydeck passes a list straight through, so reruns skip the frame-to-records conversion entirely.
+@st.cache_resource(show_spinner=False, max_entries=8)
+def transit_points_records(path: Path) -> list[dict]:
+    points = pd.DataFrame(prepared_transit_points(path).reindex(columns=TRANSIT_LAYER_COLUMNS))
+    return json.loads(points.to_json(orient="records"))
+
+# Records for the traffic PathLayer: one row per line part with its vertices as a plain [[lon, lat], ...] list,
+# so the browser draws the paths directly instead of parsing nested GeoJSON features
+@st.cache_resource(show_spinner=False, max_entries=8)
+def traffic_paths_records(path: Path) -> list[dict]:
+    traffic = prepared_traffic_lines(path)
+    # The source lines carry a constant zero Z; drop it before simplifying
+    lines = shapely.force_2d(traffic.geometry.to_numpy())
+    lines = shapely.simplify(lines, TRAFFIC_SIMPLIFY_TOLERANCE, preserve_topology=True)
+    # MultiLineStrings become one path per part, each carrying its feature's styling
+    parts, feature_idx = shapely.get_parts(lines, return_index=True)
+    coords = shapely.get_coordinates(parts)
+    paths = np.split(coords, np.cumsum(shapely.get_num_coordinates(parts))[:-1])
+    records = pd.DataFrame(traffic.reindex(columns=TRAFFIC_LAYER_COLUMNS)).iloc[feature_idx]
+    records = records.assign(path=[p.tolist() for p in paths])
+    return json.loads(records.to_json(orient="records"))
+
+# GeoJSON payload for the aggregation GeoJsonLayer, serialized once and shared read-only so pydeck skips the __geo_interface__ walk
+@st.cache_resource(show_spinner=False, max_entries=16)
+def aggregation_polygons_geojson(path: Path, metric_key: str) -> dict:
+    polygons = prepared_aggregation_polygons(path, metric_key)
+    # Coverage simplification keeps shared tract edges aligned, so no slivers open between tracts
+    polygons = polygons.assign(
+        geometry=shapely.coverage_simplify(polygons.geometry.to_numpy(), TRACT_SIMPLIFY_TOLERANCE),
+    )
+    return json.loads(polygons.to_json())
+
 #Buidling layers for our map based on user selection, with appropriate styling and interactivity
 def build_layers(selected_names: list[str], type: str) -> list[pdk.Layer]:
     layers: list[pdk.Layer] = []
@@ -73,18 +177,16 @@ def build_layers(selected_names: list[str], type: str) -> list[pdk.Layer]:
     if type == "single":
         for name in selected_names:
             dataset = DATASETS[name]
-            gdf = load_geojson(dataset["path"])
             if name == "Public Transportation":
-                layers.append(build_public_transport_layer(gdf))
+                layers.append(build_public_transport_layer(transit_points_records(dataset["path"])))
             elif name == "Traffic Volume":
-                layers.append(build_traffic_layer(gdf))
+                layers.append(build_traffic_layer(traffic_paths_records(dataset["path"])))
 
     if type == "aggregation":
         dataset = DATASETS["Census Tracts"]
-        gdf = load_geojson(dataset["path"])
         metric_key = selected_names[0] if selected_names and selected_names[0] in AGGREGATION_DATASETS else "Population"
         # Set a different opacity for the aggregation layer
-        aggregation_layer = build_aggregation_layer(gdf, metric_key)
+        aggregation_layer = build_aggregation_layer(aggregation_polygons_geojson(dataset["path"], metric_key))
         aggregation_layer.opacity = 0.5  # Set your desired opacity here (e.g., 0.5)
         layers.append(aggregation_layer)
 
@@ -111,11 +213,11 @@ def get_default_view(selected_names: list[str]) -> pdk.ViewState:
     if not selected_names:
         return pdk.ViewState(latitude=38.9072, longitude=-77.0369, zoom=10, pitch=0)
 
-    gdf = load_geojson(DATASETS[selected_names[0]]["path"])
-    if gdf.empty:
+    bounds = dataset_bounds(selected_names[0])
+    if bounds is None:
         return pdk.ViewState(latitude=38.9072, longitude=-77.0369, zoom=10, pitch=0)
 
-    minx, miny, maxx, maxy = gdf.total_bounds
+    minx, miny, maxx, maxy = bounds
     center_lat = (miny + maxy) / 2
     center_lon = (minx + maxx) / 2
     return pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=11, pitch=0)
@@ -135,14 +237,14 @@ def page_selector():
     with col4:
         st.link_button("Github", "https://github.com/matthewosmesfin/DC_Transport", width="stretch")
 
-def dataset_details(type, DATASETS, selected_layers, selected_row=None):
+def dataset_details(type, DATASETS, selected_layers, loaded, selected_row=None):
     if type == "single":
         for name in selected_layers:
-            if name in DATASETS and DATASETS[name]["path"].exists():
-                gdf = load_geojson(DATASETS[name]["path"])
+            if name in loaded:
+                gdf = loaded[name]
                 st.write(f"**{name}**")
                 st.write(f"Features: {len(gdf):,}")
-                preview = gdf.drop(columns="geometry", errors="ignore")
+                preview = dataset_preview(name)
                 # Always minimize the dataset preview by default
                 with st.expander("Show dataset preview", expanded=False):
                     st.dataframe(preview, use_container_width=True, hide_index=True)
@@ -157,10 +259,10 @@ def dataset_details(type, DATASETS, selected_layers, selected_row=None):
 
     elif type == "aggregation":
         # Census Tracts info
-        census_gdf = load_geojson(DATASETS["Census Tracts"]["path"])
+        census_gdf = loaded["Census Tracts"]
         st.write("**Census Tracts**")
         st.write(f"Features: {len(census_gdf):,}")
-        preview = census_gdf.drop(columns="geometry", errors="ignore")
+        preview = dataset_preview("Census Tracts")
         with st.expander("Show dataset preview", expanded=False):
             st.dataframe(preview, use_container_width=True, hide_index=True)
 